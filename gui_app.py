@@ -1,21 +1,127 @@
 import streamlit as st
 import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from main import (
     load_ipl_data,
     clean_ipl_data,
     analyze_ipl,
     export_report,
     generate_charts,
-    embed_charts
+    chart_output_paths,
+    filter_players
 )
 
+DATA_FILE = "ipl_data.xlsx"   # Update your file path
+
+# ---------------- Cached Data Loading / Analysis ---------------- #
+# DataFrame-keyed caches take an explicit key plus the frame as an
+# underscore argument (which Streamlit does not hash). Raw data is keyed by
+# its (path, mtime); cleaned data by a content hash computed once at cleaning.
+def df_hash(df):
+    return int(pd.util.hash_pandas_object(df, index=True).sum())
+
+@st.cache_data(show_spinner=False)
+def _cached_load(path, mtime):
+    # mtime is only part of the cache key so an edited file is re-read
+    return load_ipl_data(path)
+
+@st.cache_data(show_spinner=False)
+def _cached_clean(raw_key, _df_raw):
+    return clean_ipl_data(_df_raw)
+
+@st.cache_data(show_spinner=False)
+def _na_summary(raw_key, _df_raw):
+    return _df_raw.isna().sum()
+
+@st.cache_data(show_spinner=False)
+def _duplicate_rows(raw_key, _df_raw):
+    return _df_raw[_df_raw.duplicated()]
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _cached_to_pandas(data_hash, _table):
+    # cache_resource hands back the same frame without a pickle round-trip;
+    # callers must treat it as read-only
+    return _table.to_pandas()
+
+@st.cache_data(show_spinner=False)
+def _cached_analyze(data_hash, _table):
+    # Takes the cleaned Arrow table; it is only converted to pandas on a miss
+    df = _cached_to_pandas(data_hash, _table)
+    top_runs, top_wickets, summary = analyze_ipl(df)
+    counts = (len(df), df['Team'].nunique())
+    return top_runs, top_wickets, summary, counts
+
+# Chart images and the report workbook go to per-dataset paths, and those files
+# are their own cache: each is (re)written only when missing, so a deleted file
+# only affects its own dataset. Outputs of a replaced dataset are removed.
+def data_tag(data_hash):
+    return f"{data_hash:016x}"
+
+def charts_dir_for(data_hash, charts_dir='charts'):
+    return os.path.join(charts_dir, data_tag(data_hash))
+
+def report_file_for(data_hash):
+    return f"ipl_analysis_report_{data_tag(data_hash)}.xlsx"
+
+def remove_outputs(data_hash, charts_dir='charts'):
+    shutil.rmtree(charts_dir_for(data_hash, charts_dir), ignore_errors=True)
+    try:
+        os.remove(report_file_for(data_hash))
+    except FileNotFoundError:
+        pass
+
+def cached_generate_charts(data_hash, table, charts_dir='charts'):
+    out_dir = charts_dir_for(data_hash, charts_dir)
+    paths = chart_output_paths(out_dir)
+    if not all(os.path.exists(path) for path in paths.values()):
+        df = _cached_to_pandas(data_hash, table)
+        paths = generate_charts(df, out_dir, parallel=True)
+    return paths
+
+def cached_report(data_hash, table):
+    top_runs, top_wickets, summary, counts = _cached_analyze(data_hash, table)
+    output_file = report_file_for(data_hash)
+    if not os.path.exists(output_file):
+        chart_paths = cached_generate_charts(data_hash, table)
+        export_report(output_file, top_runs, top_wickets, summary, chart_paths)
+    return top_runs, top_wickets, summary, counts, output_file
+
 # ---------------- Search Player Function ---------------- #
-def search_player(df, player_name):
+def build_player_index(data):
+    # normalized name -> first row position, built once per dataset;
+    # cleaned data (an Arrow table) already carries the normalized key column,
+    # raw data is normalized with Arrow's string kernels
+    if isinstance(data, pa.Table):
+        keys = data.column('_player_key')
+    else:
+        keys = pc.utf8_lower(pc.utf8_trim_whitespace(pa.array(data['Player'].astype(str))))
+    index = {}
+    for i, key in enumerate(keys.to_pylist()):
+        index.setdefault(key, i)
+    return index
+
+def cleaned_df():
+    # Cleaned data is kept in session_state as an Arrow table; pages that
+    # need pandas share one read-only conversion per dataset
+    return _cached_to_pandas(st.session_state.df_ipl_hash, st.session_state.df_ipl_arrow)
+
+def hide_internal(data):
+    # Internal helper columns are not shown to the user
+    if isinstance(data, pd.Series):
+        return data.drop('_player_key', errors='ignore')
+    return data.drop(columns='_player_key', errors='ignore')
+
+def search_player(data, player_name, player_idx):
     if player_name.strip() == "":
         return None
-    result = df[df['Player'].str.strip().str.lower() == player_name.strip().lower()]
-    if not result.empty:
-        return result.iloc[0]
+    idx = player_idx.get(player_name.strip().lower())
+    if idx is not None:
+        if isinstance(data, pa.Table):
+            return data.slice(idx, 1).to_pandas().iloc[0]
+        return data.iloc[idx]
     return None
 
 # ---------------- Main Streamlit App ---------------- #
@@ -26,20 +132,16 @@ def main():
 
     # Sidebar Navigation
     st.sidebar.title("Navigation")
-    page = st.sidebar.selectbox("Choose a page", ["Search Player", "Data Cleaning", "Generate Analysis Report", "View Charts"])
+    page = st.sidebar.selectbox("Choose a page", ["Search Player", "Advanced Filter", "Data Cleaning", "Generate Analysis Report", "View Charts"])
 
-    # Load RAW IPL data
-    if 'df_raw' not in st.session_state:
-        with st.spinner("Loading IPL data..."):
-            try:
-                df_raw = load_ipl_data("ipl_data.xlsx")   # Update your file path
-                st.session_state.df_raw = df_raw
-                st.success("Raw IPL data loaded successfully!")
-            except Exception as e:
-                st.error(f"Error loading IPL data: {str(e)}")
-                return
-
-    df_raw = st.session_state.df_raw
+    # Load RAW IPL data (parsed once per file change, shared across sessions)
+    with st.spinner("Loading IPL data..."):
+        try:
+            raw_key = (DATA_FILE, os.path.getmtime(DATA_FILE))
+            df_raw = _cached_load(*raw_key)
+        except Exception as e:
+            st.error(f"Error loading IPL data: {str(e)}")
+            return
 
     # ---------------- Search Player ---------------- #
     if page == "Search Player":
@@ -47,52 +149,108 @@ def main():
         player_name = st.text_input("Enter Player Name:", placeholder="e.g., Virat Kohli")
         if st.button("Search"):
             # Use cleaned data if available, else raw
-            df_to_search = st.session_state.get('df_ipl', df_raw)
-            result = search_player(df_to_search, player_name)
+            if 'df_ipl_arrow' in st.session_state:
+                data_to_search = st.session_state.df_ipl_arrow
+                data_key = st.session_state.df_ipl_hash
+            else:
+                data_to_search, data_key = df_raw, raw_key
+            # The index holds row positions, so it is only valid for the data it was
+            # built from; rebuild it whenever that data changes (e.g. file reloaded)
+            index_key, player_idx = st.session_state.get('player_idx', (None, None))
+            if index_key != data_key:
+                player_idx = build_player_index(data_to_search)
+                st.session_state.player_idx = (data_key, player_idx)
+            result = search_player(data_to_search, player_name, player_idx)
             if result is not None:
                 st.success("Player found!")
 
                 col1, col2 = st.columns(2)
+                # One markdown block per column instead of one element per line
                 with col1:
                     st.subheader("Player Info")
-                    st.write(f"**Name:** {result['Player']}")
-                    st.write(f"**Role:** {result['Role']}")
-                    st.write(f"**Team:** {result['Team']}")
-                    st.write(f"**Matches:** {result['Matches']}")
+                    st.markdown(
+                        f"**Name:** {result['Player']}\n\n"
+                        f"**Role:** {result['Role']}\n\n"
+                        f"**Team:** {result['Team']}\n\n"
+                        f"**Matches:** {result['Matches']}"
+                    )
                 with col2:
                     st.subheader("Performance Stats")
-                    st.write(f"**Runs:** {result['Runs']}")
-                    st.write(f"**Batting SR:** {result['Bat_SR']}")
+                    stats_md = (
+                        f"**Runs:** {result['Runs']}\n\n"
+                        f"**Batting SR:** {result['Bat_SR']}"
+                    )
                     if result['Wickets'] > 0:
-                        st.write(f"**Wickets:** {result['Wickets']}")
-                        st.write(f"**Economy:** {result['Econ']}")
+                        stats_md += (
+                            f"\n\n**Wickets:** {result['Wickets']}"
+                            f"\n\n**Economy:** {result['Econ']}"
+                        )
+                    st.markdown(stats_md)
 
                 with st.expander("📋 Show Full Record"):
-                    st.dataframe(result.to_frame().T)
+                    st.dataframe(hide_internal(result).to_frame().T)
             else:
                 st.error("Player not found. Please check the name.")
 
+    # ---------------- Advanced Filter ---------------- #
+    elif page == "Advanced Filter":
+        st.header("🎯 Advanced Player Filter")
+
+        if 'df_ipl_arrow' not in st.session_state:
+            st.warning("⚠️ Please clean the data first (use Data Cleaning page).")
+            return
+
+        df = cleaned_df()
+
+        col1, col2 = st.columns(2)
+        with col1:
+            team = st.selectbox("Team", ["All"] + list(df['Team'].cat.categories))
+            role = st.selectbox("Role", ["All"] + list(df['Role'].cat.categories))
+        with col2:
+            min_runs = st.number_input("Minimum Runs", min_value=0, value=0, step=50)
+            min_wickets = st.number_input("Minimum Wickets", min_value=0, value=0, step=5)
+
+        if st.button("Apply Filter"):
+            result = filter_players(
+                df,
+                team=None if team == "All" else team,
+                role=None if role == "All" else role,
+                min_runs=int(min_runs),
+                min_wickets=int(min_wickets)
+            )
+            if not result.empty:
+                st.success(f"{len(result)} player(s) match the filter.")
+                st.dataframe(hide_internal(result))
+            else:
+                st.error("No players match the filter.")
+
     # ---------------- Data Cleaning ---------------- #
     elif page == "Data Cleaning":
         st.header("🧹 Data Cleaning Overview")
         st.markdown("Inspect and clean missing values & duplicates in the IPL dataset.")
 
         st.subheader("Missing Values (Before Cleaning)")
-        st.dataframe(df_raw.isna().sum())
+        st.dataframe(_na_summary(raw_key, df_raw))
 
         st.subheader("Duplicate Rows (Before Cleaning)")
-        duplicates = df_raw[df_raw.duplicated()]
+        duplicates = _duplicate_rows(raw_key, df_raw)
         if not duplicates.empty:
             st.dataframe(duplicates)
         else:
             st.write("✅ No duplicate rows found.")
 
         if st.button("Clean Data Now"):
-            cleaned_df = clean_ipl_data(df_raw.copy())
-            st.session_state.df_ipl = cleaned_df.copy()
+            # clean_ipl_data builds new frames rather than mutating df_raw, so no copies needed
+            cleaned = _cached_clean(raw_key, df_raw)
+            new_hash = df_hash(cleaned)
+            old_hash = st.session_state.get('df_ipl_hash')
+            if old_hash is not None and old_hash != new_hash:
+                remove_outputs(old_hash)  # charts/report of the replaced dataset
+            st.session_state.df_ipl_arrow = pa.Table.from_pandas(cleaned, preserve_index=False)
+            st.session_state.df_ipl_hash = new_hash
             st.success("Data cleaned successfully!")
             st.subheader("Cleaned Data Preview")
-            st.dataframe(cleaned_df.head(70))
+            st.dataframe(hide_internal(cleaned.head(70)))
 
             st.info("Cleaning Steps Applied:\n"
                     "- Missing Player/Role/Team filled with 'Unknown'\n"
@@ -103,29 +261,25 @@ def main():
     elif page == "Generate Analysis Report":
         st.header("📊 Generate Analysis Report")
 
-        if 'df_ipl' not in st.session_state:
+        if 'df_ipl_arrow' not in st.session_state:
             st.warning("⚠️ Please clean the data first (use Data Cleaning page).")
             return
 
-        df = st.session_state.df_ipl
-
         if st.button("Generate Complete Analysis Report"):
             with st.spinner("Generating report..."):
                 try:
-                    top_runs, top_wickets, summary = analyze_ipl(df)
-
-                    output_file = "ipl_analysis_report.xlsx"
-                    export_report(output_file, top_runs, top_wickets, summary)
-                    chart_paths = generate_charts(df)
-                    embed_charts(output_file, chart_paths)
+                    top_runs, top_wickets, summary, counts, output_file = cached_report(
+                        st.session_state.df_ipl_hash, st.session_state.df_ipl_arrow
+                    )
+                    n_players, n_teams = counts
 
                     st.success("Analysis report generated successfully!")
 
                     st.subheader("Summary")
                     col1, col2, col3 = st.columns(3)
                     with col1:
-                        st.metric("Total Players", len(df))
-                        st.metric("Total Teams", df['Team'].nunique())
+                        st.metric("Total Players", n_players)
+                        st.metric("Total Teams", n_teams)
                     with col2:
                         st.metric("Top Run Scorer", top_runs.iloc[0]['Player'])
                         st.metric("Runs", int(top_runs.iloc[0]['Runs']))
@@ -138,7 +292,7 @@ def main():
                             st.download_button(
                                 label="📥 Download Analysis Report (Excel)",
                                 data=f.read(),
-                                file_name=output_file,
+                                file_name="ipl_analysis_report.xlsx",
                                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                             )
                 except Exception as e:
@@ -148,12 +302,12 @@ def main():
     elif page == "View Charts":
         st.header("📈 IPL Data Visualization Charts")
 
-        if 'df_ipl' not in st.session_state:
+        if 'df_ipl_arrow' not in st.session_state:
             st.warning("⚠️ Please clean the data first (use Data Cleaning page).")
             return
 
-        df = st.session_state.df_ipl
         charts_dir = "charts"
+        data_charts_dir = charts_dir_for(st.session_state.df_ipl_hash, charts_dir)
         chart_files = {
             "Runs Distribution": "runs_dist.png",
             "Wickets Distribution": "wickets_dist.png",
@@ -164,13 +318,13 @@ def main():
         if st.button("Generate Charts"):
             with st.spinner("Generating charts..."):
                 try:
-                    generate_charts(df, charts_dir)  # overwrite existing charts
+                    cached_generate_charts(st.session_state.df_ipl_hash, st.session_state.df_ipl_arrow, charts_dir)  # re-rendered only when the data changes
                     st.success("Charts generated successfully!")
                 except Exception as e:
                     st.error(f"Error generating charts: {str(e)}")
 
         for chart_name, chart_file in chart_files.items():
-            chart_path = os.path.join(charts_dir, chart_file)
+            chart_path = os.path.join(data_charts_dir, chart_file)
             if os.path.exists(chart_path):
                 st.subheader(chart_name)
                 st.image(chart_path, use_column_width=True)
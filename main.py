@@ -1,17 +1,40 @@
 import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-from openpyxl import load_workbook
-from openpyxl.drawing.image import Image as XLImage
+
+# Plotting libraries are imported lazily, inside the functions that need them,
+# so importing this module (e.g. from the Streamlit app) stays cheap.
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; filter_players falls back to NumPy
+    njit = None
 
 # ---------------- 1) Load Data ---------------- #
 def load_ipl_data(file_path: str):
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"{file_path} does not exist.")
-    df = pd.read_excel(file_path) if file_path.endswith(".xlsx") else pd.read_csv(file_path)
+    df = _read_excel(file_path) if file_path.endswith(".xlsx") else _read_csv(file_path)
     return df
 
+def _read_excel(file_path):
+    # calamine (pandas >= 2.2 + python-calamine) parses xlsx natively; openpyxl otherwise
+    try:
+        return pd.read_excel(file_path, engine="calamine")
+    except (ImportError, ValueError):
+        return pd.read_excel(file_path)
+
+def _read_csv(file_path):
+    # pyarrow engine parses CSV multithreaded when pyarrow is installed
+    try:
+        return pd.read_csv(file_path, engine="pyarrow")
+    except ImportError:
+        return pd.read_csv(file_path)
+
 # ---------------- 2) Clean Data ---------------- #
 def clean_ipl_data(df):
     df = df.fillna({
@@ -25,92 +48,220 @@ def clean_ipl_data(df):
         'Econ': 0
     })
     # Ensure numeric columns are numeric
-    for col in ['Runs', 'Wickets', 'Bat_SR', 'Econ']:
+    for col in ['Matches', 'Runs', 'Wickets', 'Bat_SR', 'Econ']:
         df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-    
+
+    # Narrow integer dtypes for the counters (every IPL count fits). Rate stats
+    # stay float64 so displayed and reported values are exact.
+    df = df.astype({
+        'Matches': 'int32',
+        'Runs': 'int32',
+        'Wickets': 'int16'
+    })
+
     df = df.drop_duplicates(subset=['Player', 'Team'])
+
+    # Low-cardinality labels as categories so groupby/nunique work on integer codes
+    for col in ['Team', 'Role']:
+        df[col] = df[col].astype('category')
+
+    # Normalized search key, computed once here instead of on every lookup
+    player_key = df['Player'].astype(str).str.strip().str.lower()
+    try:
+        df['_player_key'] = player_key.astype('string[pyarrow]')
+    except ImportError:
+        df['_player_key'] = player_key.astype('string')
     return df
 
 # ---------------- 3) Analyze Data ---------------- #
+def _top_n(df, col, n=10):
+    # O(N) partial selection of the n largest, then sort only those n rows.
+    # Matches nlargest(keep='first'): rows tied at the cutoff value are taken
+    # in original order, and ties inside the top n keep original order too.
+    values = df[col].to_numpy()
+    n = min(n, values.size)
+    if n == 0:
+        return df.iloc[:0][['Player', 'Team', col]]
+    cutoff = values[np.argpartition(values, -n)[-n]]
+    above = np.flatnonzero(values > cutoff)
+    tied = np.flatnonzero(values == cutoff)[:n - above.size]
+    idx = np.concatenate([above, tied])
+    idx = idx[np.lexsort((idx, -values[idx]))]  # descending, ties by original order
+    return df.iloc[idx][['Player', 'Team', col]]
+
 def analyze_ipl(df):
-    top_runs = df.nlargest(10, 'Runs')[['Player', 'Team', 'Runs']]
-    top_wickets = df.nlargest(10, 'Wickets')[['Player', 'Team', 'Wickets']]
+    top_runs = _top_n(df, 'Runs')
+    top_wickets = _top_n(df, 'Wickets')
     
-    # Summary stats
+    # Summary stats (economy averaged over bowlers only, i.e. non-zero Econ)
+    econ = df['Econ'].to_numpy()
+    nonzero = econ[econ != 0]
     summary = pd.Series({
         'Avg_Batting_SR': df['Bat_SR'].mean(),
-        'Avg_Bowling_Econ': df['Econ'].replace(0, pd.NA).dropna().astype(float).mean()
+        'Avg_Bowling_Econ': nonzero.mean() if nonzero.size else 0.0
     })
     
     return top_runs, top_wickets, summary
 
+# ---------------- 3b) Filter Players ---------------- #
+# All clauses are evaluated in one pass over the column arrays, so no
+# intermediate boolean array is materialized per clause. A team/role id
+# of -1 means "any".
+# The kernel is deliberately serial: fusing the clauses is the win, thread
+# fan-out is overhead at this size, and numba's parallel layers (e.g. TBB) can
+# hang when called from Streamlit's script thread.
+if njit is not None:
+    @njit(cache=True)
+    def _filter_mask(runs, wickets, team_codes, role_codes,
+                     min_runs, min_wickets, team_id, role_id, out):
+        for i in range(runs.size):
+            out[i] = (runs[i] >= min_runs and wickets[i] >= min_wickets
+                      and (team_id < 0 or team_codes[i] == team_id)
+                      and (role_id < 0 or role_codes[i] == role_id))
+else:
+    def _filter_mask(runs, wickets, team_codes, role_codes,
+                     min_runs, min_wickets, team_id, role_id, out):
+        out[:] = (runs >= min_runs) & (wickets >= min_wickets)
+        if team_id >= 0:
+            out &= team_codes == team_id
+        if role_id >= 0:
+            out &= role_codes == role_id
+
+def _category_code(col, value):
+    if value is None:
+        return -1
+    return col.cat.categories.get_indexer([value])[0]
+
+def filter_players(df, team=None, role=None, min_runs=0, min_wickets=0):
+    # Expects cleaned data, where Team/Role are categoricals
+    team_id = _category_code(df['Team'], team)
+    role_id = _category_code(df['Role'], role)
+    if (team is not None and team_id < 0) or (role is not None and role_id < 0):
+        return df.iloc[:0]  # unknown label matches nobody
+
+    out = np.empty(len(df), dtype=np.bool_)
+    _filter_mask(df['Runs'].to_numpy(), df['Wickets'].to_numpy(),
+                 df['Team'].cat.codes.to_numpy(), df['Role'].cat.codes.to_numpy(),
+                 min_runs, min_wickets, team_id, role_id, out)
+    return df[out]
+
 # ---------------- 4) Generate Charts ---------------- #
-def generate_charts(df, charts_dir='charts'):
+# Renderers are top-level so they can be pickled into the chart pool's workers;
+# each one receives only the small array/Series it plots, never the whole frame.
+_figure = None
+
+def _reset_figure(figsize):
+    # Pool workers live for the whole app, so each keeps one Figure and clears it
+    # for every chart it draws (across generate_charts calls) instead of recreating it
+    global _figure
+    if _figure is None:
+        import matplotlib
+        matplotlib.use('Agg')  # headless backend for the chart worker processes
+        from matplotlib.figure import Figure
+        _figure = Figure()
+    _figure.clf()
+    _figure.set_size_inches(figsize)
+    return _figure, _figure.add_subplot(111)
+
+def _render_distribution(values, label, title, path):
+    # Plain 20-bin histogram; a KDE fit adds cost but nothing over the bins for counts
+    counts, edges = np.histogram(values, bins=20)
+    fig, ax = _reset_figure((8,5))
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', edgecolor='white')
+    ax.set_xlabel(label)
+    ax.set_ylabel('Count')
+    ax.set_title(title)
+    fig.savefig(path, bbox_inches='tight')
+
+def _render_team_bar(totals, title, path):
+    fig, ax = _reset_figure((10,5))
+    import seaborn as sns
+    sns.barplot(x=totals.index.astype(str), y=totals.values, ax=ax)
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.set_title(title)
+    fig.savefig(path, bbox_inches='tight')
+
+def _dispatch(job):
+    render, args = job
+    render(*args)
+
+_chart_pool = None
+_chart_pool_lock = threading.Lock()
+_render_lock = threading.Lock()  # guards the shared Figure when rendering in-process
+
+def _get_chart_pool():
+    # One long-lived pool, created on first use: workers pay the plotting imports
+    # once. Never fork the (multi-threaded) Streamlit server; use forkserver where
+    # available, spawn otherwise.
+    global _chart_pool
+    with _chart_pool_lock:
+        if _chart_pool is None:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _chart_pool = ProcessPoolExecutor(max_workers=4,
+                                              mp_context=multiprocessing.get_context(method))
+    return _chart_pool
+
+def _render_in_pool(jobs):
+    pool = _get_chart_pool()
+    try:
+        list(pool.map(_dispatch, jobs))
+    except BrokenProcessPool:
+        # A worker died (OOM kill, segfault); replace the pool and retry once
+        global _chart_pool
+        with _chart_pool_lock:
+            if _chart_pool is pool:
+                _chart_pool = None
+        pool.shutdown(wait=False)
+        list(_get_chart_pool().map(_dispatch, jobs))
+
+def chart_output_paths(charts_dir='charts'):
+    return {
+        'runs': os.path.join(charts_dir, 'runs_dist.png'),
+        'wickets': os.path.join(charts_dir, 'wickets_dist.png'),
+        'team_runs': os.path.join(charts_dir, 'team_runs.png'),
+        'team_wickets': os.path.join(charts_dir, 'team_wickets.png')
+    }
+
+def generate_charts(df, charts_dir='charts', parallel=False):
+    # parallel=True renders on the long-lived process pool, which only pays off
+    # in a long-running app; one-shot callers (the CLI) render in-process.
     os.makedirs(charts_dir, exist_ok=True)
-    paths = {}
-
-    # Runs Distribution
-    plt.figure(figsize=(8,5))
-    sns.histplot(df['Runs'], bins=20, kde=True)
-    plt.title("Runs Distribution")
-    runs_path = os.path.join(charts_dir, 'runs_dist.png')
-    plt.savefig(runs_path, bbox_inches='tight')
-    plt.close()
-    paths['runs'] = runs_path
-
-    # Wickets Distribution
-    plt.figure(figsize=(8,5))
-    sns.histplot(df['Wickets'], bins=20, kde=True)
-    plt.title("Wickets Distribution")
-    wickets_path = os.path.join(charts_dir, 'wickets_dist.png')
-    plt.savefig(wickets_path, bbox_inches='tight')
-    plt.close()
-    paths['wickets'] = wickets_path
-
-    # Team-wise Runs
-    plt.figure(figsize=(10,5))
-    team_runs = df.groupby('Team')['Runs'].sum().sort_values(ascending=False)
-    sns.barplot(x=team_runs.index, y=team_runs.values)
-    plt.xticks(rotation=45)
-    plt.title("Total Runs by Team")
-    team_runs_path = os.path.join(charts_dir, 'team_runs.png')
-    plt.savefig(team_runs_path, bbox_inches='tight')
-    plt.close()
-    paths['team_runs'] = team_runs_path
-
-    # Team-wise Wickets
-    plt.figure(figsize=(10,5))
-    team_wkts = df.groupby('Team')['Wickets'].sum().sort_values(ascending=False)
-    sns.barplot(x=team_wkts.index, y=team_wkts.values)
-    plt.xticks(rotation=45)
-    plt.title("Total Wickets by Team")
-    team_wkts_path = os.path.join(charts_dir, 'team_wickets.png')
-    plt.savefig(team_wkts_path, bbox_inches='tight')
-    plt.close()
-    paths['team_wickets'] = team_wkts_path
+    paths = chart_output_paths(charts_dir)
+
+    # One pass over Team for both team-wise totals
+    team_agg = df.groupby('Team', observed=True)[['Runs', 'Wickets']].sum()
+    team_runs = team_agg['Runs'].sort_values(ascending=False)
+    team_wkts = team_agg['Wickets'].sort_values(ascending=False)
+
+    jobs = [
+        (_render_distribution, (df['Runs'].to_numpy(), 'Runs', "Runs Distribution", paths['runs'])),
+        (_render_distribution, (df['Wickets'].to_numpy(), 'Wickets', "Wickets Distribution", paths['wickets'])),
+        (_render_team_bar, (team_runs, "Total Runs by Team", paths['team_runs'])),
+        (_render_team_bar, (team_wkts, "Total Wickets by Team", paths['team_wickets']))
+    ]
+    if parallel:
+        # Rasterizing + PNG compression is CPU bound, so render the charts on separate cores
+        _render_in_pool(jobs)
+    else:
+        with _render_lock:
+            for job in jobs:
+                _dispatch(job)
 
     return paths
 
-# ---------------- 5) Export Report ---------------- #
-def export_report(output_file, top_runs, top_wickets, summary):
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+# ---------------- 5) Export Report (with Charts) ---------------- #
+def export_report(output_file, top_runs, top_wickets, summary, chart_paths=None):
+    # Sheets and chart images go into one workbook that is saved exactly once
+    with pd.ExcelWriter(output_file, engine='xlsxwriter') as writer:
         top_runs.to_excel(writer, sheet_name="Top_Run_Scorers", index=False)
         top_wickets.to_excel(writer, sheet_name="Top_Wicket_Takers", index=False)
         summary_df = summary.rename("Value").reset_index().rename(columns={'index':'Metric'})
         summary_df.to_excel(writer, sheet_name="Summary", index=False)
 
-# ---------------- 6) Embed Charts in Excel ---------------- #
-def embed_charts(excel_file, chart_paths):
-    wb = load_workbook(excel_file)
-    if 'Charts' not in wb.sheetnames:
-        wb.create_sheet('Charts')
-    ws = wb['Charts']
-    row = 1
-    for label, path in chart_paths.items():
-        img = XLImage(path)
-        ws.add_image(img, f"A{row}")
-        row += 25  # leave enough space for next chart
-    wb.save(excel_file)
+        if chart_paths:
+            ws = writer.book.add_worksheet('Charts')
+            for i, (label, path) in enumerate(chart_paths.items()):
+                ws.insert_image(i * 25, 0, path)  # leave enough space for next chart
 
 # ---------------- Orchestration ---------------- #
 def main():
@@ -124,10 +275,9 @@ def main():
 
     top_runs, top_wickets, summary = analyze_ipl(df)
 
-    export_report(output_excel, top_runs, top_wickets, summary)
-
     chart_paths = generate_charts(df, charts_dir)
-    embed_charts(output_excel, chart_paths)
+
+    export_report(output_excel, top_runs, top_wickets, summary, chart_paths)
 
     # Console Output
     print("✅ IPL Analysis Completed!\n")